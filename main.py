@@ -2,15 +2,66 @@ import os
 import sys
 import asyncio
 import subprocess
+import logging
+import time
 import zipfile
+import shutil
+import json
+from concurrent.futures import ThreadPoolExecutor
+from importlib.metadata import version
 from aiohttp import web
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
 
-# ✅ Flush logs immediately
-sys.stdout.reconfigure(line_buffering=True)
+# 🎭 Playwright is imported lazily (load_playwright) so the health server binds first
+async_playwright = PlaywrightError = PlaywrightTimeout = None
+
+def load_playwright():
+    global async_playwright, PlaywrightError, PlaywrightTimeout
+    from playwright.async_api import async_playwright, Error as PlaywrightError, TimeoutError as PlaywrightTimeout
+
+# ⚡ ISA-L DEFLATE for zipfile when installed (same format, SIMD-accelerated)
+try:
+    from isal import isal_zlib
+    zipfile.zlib = isal_zlib
+except ImportError:
+    pass
+
+# ⚡ uvloop when installed (faster socket IO for aiohttp and the Playwright pipe)
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# ✅ Logging (one stdout handler; debug calls pass lazy %s args, so muted lines are never formatted)
+# Records sit in stdout's buffer and go out in one write per LOG_FLUSH_INTERVAL;
+# warnings and errors flush immediately. logging's own atexit hook flushes the rest.
+class BatchedStreamHandler(logging.StreamHandler):
+    def emit(self, record):
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+            if record.levelno >= logging.WARNING:
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+LOG_FLUSH_INTERVAL = 1.0  # seconds
+log_handler = BatchedStreamHandler(sys.stdout)
+
+# LOG_LEVEL=DEBUG shows the per-chat steps; the INFO default keeps Render logs quiet
+logging.basicConfig(
+    level=os.environ.get("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(message)s",
+    handlers=[log_handler],
+)
+log = logging.getLogger("wati")
+
+async def flush_logs_periodically():
+    while True:
+        await asyncio.sleep(LOG_FLUSH_INTERVAL)
+        log_handler.flush()
 
 # ✅ Detect environment
 ON_RENDER = os.environ.get("RENDER") == "true"
+BOT_MODE = os.environ.get("BOT_MODE", "run")  # "save" = capture a login and exit
 
 # ✅ Configure Playwright browser path
 if ON_RENDER:
@@ -26,67 +77,125 @@ USER_DATA_DIR = (
 )
 
 # 🧩 Unzip saved login profile
+UNZIP_WORKERS = 4
+
+def extract_zip_member(zip_ref, info, dest):
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    # 1 MB copy buffer: far fewer small reads than extractall()
+    with zip_ref.open(info) as src, open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst, length=1 << 20)
+
 def unzip_wati_profile():
     zip_path = os.path.join(os.getcwd(), "wati_profile.zip")
     if ON_RENDER and os.path.exists(zip_path):
         if not os.path.exists(USER_DATA_DIR):
-            print("📦 Extracting saved login (wati_profile.zip)...", flush=True)
-            with zipfile.ZipFile(zip_path, "r") as zip_ref:
-                zip_ref.extractall(os.path.dirname(USER_DATA_DIR))
-            print("✅ Login data extracted successfully!", flush=True)
+            log.info("📦 Extracting saved login (wati_profile.zip)...")
+            target_dir = os.path.dirname(USER_DATA_DIR)
+            # Members inflate in parallel: zlib/ISA-L release the GIL while decompressing.
+            # A 1 MB read buffer turns the many small header/member reads into few syscalls.
+            with open(zip_path, "rb", buffering=1 << 20) as zip_file, \
+                    zipfile.ZipFile(zip_file, "r") as zip_ref, \
+                    ThreadPoolExecutor(max_workers=UNZIP_WORKERS) as pool:
+                jobs = []
+                for info in zip_ref.infolist():
+                    dest = os.path.realpath(os.path.join(target_dir, info.filename))
+                    if not dest.startswith(os.path.realpath(target_dir) + os.sep):
+                        continue  # never write outside the extraction folder
+                    if info.is_dir():
+                        os.makedirs(dest, exist_ok=True)
+                        continue
+                    jobs.append(pool.submit(extract_zip_member, zip_ref, info, dest))
+                for job in jobs:
+                    job.result()
+            log.info("✅ Login data extracted successfully!")
         else:
-            print("✅ Existing login folder detected — skipping unzip.", flush=True)
+            log.info("✅ Existing login folder detected — skipping unzip.")
+
+# ✅ Cached Chromium executable path (skips Playwright driver startup on warm boots)
+CHROMIUM_CACHE_FILE = os.path.join(os.environ["PLAYWRIGHT_BROWSERS_PATH"], ".chromium_path.json")
+
+def read_cached_chromium_path():
+    try:
+        with open(CHROMIUM_CACHE_FILE, "r") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # A Playwright upgrade pins a new Chromium revision, so the cache is per version
+    # Looked up here (after load_playwright), not at import, so startup skips the metadata scan
+    if cached.get("playwright") != version("playwright"):
+        return None
+    return cached.get("executable_path")
+
+def write_cached_chromium_path(chromium_path):
+    with open(CHROMIUM_CACHE_FILE, "w") as f:
+        json.dump({"playwright": version("playwright"), "executable_path": chromium_path}, f)
 
 # ✅ Ensure Chromium installed
 async def ensure_chromium_installed():
-    chromium_path = os.path.join(os.environ["PLAYWRIGHT_BROWSERS_PATH"], "chromium-1117/chrome-linux/chrome")
+    cached_path = read_cached_chromium_path()
+    if cached_path and os.path.exists(cached_path):
+        log.info("✅ Chromium already installed.")
+        return
+
+    async with async_playwright() as p:
+        chromium_path = p.chromium.executable_path
+
     if not os.path.exists(chromium_path):
-        print("🧩 Installing Chromium...", flush=True)
-        process = await asyncio.create_subprocess_exec(
-            sys.executable, "-m", "playwright", "install", "chromium",
-            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT
+        log.info("🧩 Installing Chromium...")
+        log_handler.flush()  # keep our buffered lines ahead of the installer's output
+        # Installer output goes straight to our stdout; no Python relay loop.
+        # Spawned from a worker thread so the fork/exec never stalls the event loop.
+        # Note: a to_thread install cannot be cancelled; on TaskGroup teardown the
+        # installer keeps running until it exits on its own.
+        result = await asyncio.to_thread(
+            subprocess.run, [sys.executable, "-m", "playwright", "install", "chromium"]
         )
-        while True:
-            line = await process.stdout.readline()
-            if not line:
-                break
-            print(line.decode().strip(), flush=True)
-        await process.wait()
-        print("✅ Chromium installed successfully!", flush=True)
+        if result.returncode != 0:
+            log.error(f"🚨 Chromium install failed (exit code {result.returncode}).")
+            raise RuntimeError("playwright install chromium failed")
+        log.info("✅ Chromium installed successfully!")
     else:
-        print("✅ Chromium already installed.", flush=True)
+        log.info("✅ Chromium already installed.")
+
+    if os.path.exists(chromium_path):
+        write_cached_chromium_path(chromium_path)
 
 # 🌐 Configuration
 WATI_URL = "https://live.wati.io/1037246/teamInbox/"
 LOGIN_URL = "https://auth.wati.io/login"
-CHECK_INTERVAL = 180  # seconds
+# Team Inbox root: an ID lookup per poll instead of a full-page text scan
+INBOX_READY_SELECTOR = "#mainTeamInbox"
+CHECK_INTERVAL = 15  # seconds, starting poll interval
+MIN_CHECK_INTERVAL = 10  # seconds, floor while chats keep arriving
+MAX_CHECK_INTERVAL = 300  # seconds, ceiling when the inbox is idle
+MANUAL_LOGIN_TIMEOUT = 300000  # ms a human gets to finish the login form
 
 # ✅ Manual login helper
 async def wait_for_manual_login(page, browser_context):
-    print("\n============================")
-    print("🟢 MANUAL LOGIN REQUIRED")
-    print("============================", flush=True)
-    print("➡️ Complete your WATI login in the opened browser.")
-    print("➡️ Once 'Team Inbox' is visible, press ENTER to save the session.\n", flush=True)
+    log.info("============================")
+    log.info("🟢 MANUAL LOGIN REQUIRED")
+    log.info("============================")
+    log.info("➡️ Complete your WATI login in the opened browser.")
+    log.info("➡️ The session is saved automatically once WATI redirects after login.")
 
     await page.goto(LOGIN_URL, wait_until="networkidle")
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(None, lambda: input("👉 Press ENTER after login is complete... "))
 
     try:
+        # Returns the moment the login lands on the app host; no ENTER prompt
+        await page.wait_for_url("https://live.wati.io/**", timeout=MANUAL_LOGIN_TIMEOUT)
         await page.goto(WATI_URL, timeout=60000)
-        await page.wait_for_selector("text=Team Inbox", timeout=30000)
-        print("✅ Login detected! Saving session...", flush=True)
+        await page.wait_for_selector(INBOX_READY_SELECTOR, timeout=30000)
+        log.info("✅ Login detected! Saving session...")
         await browser_context.storage_state(path=os.path.join(USER_DATA_DIR, "storage.json"))
-        print("✅ Session saved successfully as storage.json", flush=True)
+        log.info("✅ Session saved successfully as storage.json")
         return True
     except PlaywrightTimeout:
-        print("🚨 Login was not detected. Please retry.", flush=True)
+        log.warning("🚨 Login was not detected. Please retry.")
         return False
 
 # ✅ Automatic login function (corrected)
 async def auto_login(page):
-    print("🔑 Attempting automatic login...", flush=True)
+    log.info("🔑 Attempting automatic login...")
 
     js_script = """() => {
         function setReactInputValue(element, value) {
@@ -119,97 +228,269 @@ async def auto_login(page):
 
     try:
         await page.evaluate(js_script)
-        await page.wait_for_selector("text=Team Inbox", timeout=30000)
-        print("✅ Automatic login successful!", flush=True)
+        await page.wait_for_selector(INBOX_READY_SELECTOR, timeout=30000)
+        log.info("✅ Automatic login successful!")
         return True
     except PlaywrightTimeout:
-        print("❌ Automatic login failed. Check credentials or page structure.", flush=True)
+        log.warning("❌ Automatic login failed. Check credentials or page structure.")
         return False
 
+# 🏷️ Tag every unread chat row in one round-trip; returns the number tagged
+TAG_UNREAD_CHATS_JS = """() => {
+    document.querySelectorAll('[data-bot-idx]').forEach(n => n.removeAttribute('data-bot-idx'));
+    const badges = [...document.querySelectorAll('div.conversation-item__unread-count')];
+    badges.forEach((badge, i) => {
+        const row = badge.closest('.conversation-item') || badge;
+        row.setAttribute('data-bot-idx', i);
+    });
+    return badges.length;
+}"""
+
+# ⏱️ Adaptive chat-load timeout: 3x the moving average of observed load times
+EWMA_ALPHA = 0.2
+ewma_load_seconds = 2.0
+MAX_CHAT_TIMEOUT_MS = 30000  # ceiling so repeated failures can't stall the bot
+
+def adaptive_timeout_ms():
+    return int(min(MAX_CHAT_TIMEOUT_MS, max(5000, 3000 * ewma_load_seconds)))
+
+def record_load_seconds(seconds):
+    global ewma_load_seconds
+    ewma_load_seconds = (1 - EWMA_ALPHA) * ewma_load_seconds + EWMA_ALPHA * seconds
+
+async def wait_for_adaptive(locator, state="visible"):
+    timeout_ms = adaptive_timeout_ms()
+    started = time.monotonic()
+    try:
+        await locator.wait_for(state=state, timeout=timeout_ms)
+    except PlaywrightTimeout:
+        # Count a timeout as twice the allowed time so the limit grows back
+        # when the inbox gets slower, instead of failing every chat forever
+        record_load_seconds(min(MAX_CHAT_TIMEOUT_MS, 2 * timeout_ms) / 1000)
+        raise
+    record_load_seconds(time.monotonic() - started)
+
+# 👉 Scroll to and open a tagged chat row in one round-trip
+OPEN_CHAT_JS = """(idx) => {
+    const row = document.querySelector(`[data-bot-idx="${idx}"]`);
+    if (!row) return false;
+    row.scrollIntoView({ block: 'center' });
+    row.click();
+    return true;
+}"""
+
+# 🔄 Reload the inbox and wait until the SPA has rendered it again
+async def reload_inbox(page):
+    await page.reload()
+    await page.wait_for_selector(INBOX_READY_SELECTOR, timeout=30000)
+
+# 🔔 In-page watcher: calls window.notifyUnread() when the unread count grows
+UNREAD_OBSERVER_JS = """() => {
+    if (window.__watiUnreadObserver) return;
+    let lastCount = 0;
+    let pending = false;
+    const check = () => {
+        pending = false;
+        const count = document.querySelectorAll('div.conversation-item__unread-count').length;
+        if (count > lastCount) window.notifyUnread();
+        lastCount = count;
+    };
+    window.__watiUnreadObserver = new MutationObserver(() => {
+        if (pending) return;
+        pending = true;
+        setTimeout(check, 500);
+    });
+    window.__watiUnreadObserver.observe(document, { subtree: true, childList: true });
+}"""
+
+# 😴 Sleep until the watcher reports a new unread chat; reload only as a fallback
+async def wait_for_unread(page, unread_event, timeout):
+    try:
+        await asyncio.wait_for(unread_event.wait(), timeout=timeout)
+        log.info("🔔 New unread chat detected!")
+    except asyncio.TimeoutError:
+        await reload_inbox(page)
+
 # ✅ Main automation loop
 async def main_automation(page):
-    while True:
-        print("🔎 Checking for unread chats...", flush=True)
-        try:
-            await page.wait_for_selector("div.conversation-item__unread-count", timeout=10000)
-        except PlaywrightTimeout:
-            print("😴 No unread chats found. Waiting 3 mins...", flush=True)
-            await asyncio.sleep(CHECK_INTERVAL)
-            await page.reload()
-            continue
+    # Build locators once; Playwright reuses the parsed selectors every chat
+    unread_loc = page.locator("div.conversation-item__unread-count")
+    options_loc = page.locator("#mainTeamInbox div.chat-side-content div span.chat-input__icon-option")
+    ads_loc = page.locator("#flow-nav-68ff67df4f393f0757f108d8")
+
+    # Push new-chat events from the page instead of polling with reloads
+    unread_event = asyncio.Event()
+    await page.expose_function("notifyUnread", unread_event.set)
+    await page.add_init_script(f"({UNREAD_OBSERVER_JS})()")
+    await page.evaluate(UNREAD_OBSERVER_JS)
 
-        unread_elements = await page.query_selector_all("div.conversation-item__unread-count")
-        if not unread_elements:
-            print("😴 No unread chats. Waiting 3 mins...", flush=True)
-            await asyncio.sleep(CHECK_INTERVAL)
-            await page.reload()
+    current_interval = CHECK_INTERVAL
+
+    while True:
+        log.debug("🔎 Checking for unread chats...")
+        unread_event.clear()
+        total_unread = await page.evaluate(TAG_UNREAD_CHATS_JS)
+        if not total_unread:
+            # Cheap probe said empty; give a still-hydrating list one short second
+            try:
+                await unread_loc.first.wait_for(state="attached", timeout=1000)
+                total_unread = await page.evaluate(TAG_UNREAD_CHATS_JS)
+            except PlaywrightTimeout:
+                pass
+        if not total_unread:
+            current_interval = min(MAX_CHECK_INTERVAL, current_interval * 2)
+            log.info(f"😴 No unread chats. Waiting {current_interval}s...")
+            await wait_for_unread(page, unread_event, current_interval)
             continue
 
-        print(f"💬 Found {len(unread_elements)} unread chat(s). Processing...", flush=True)
+        log.info(f"💬 Found {total_unread} unread chat(s). Processing...")
         processed = 0
 
-        for elem in unread_elements:
+        for idx in range(total_unread):
             processed += 1
-            print(f"👉 Opening unread chat {processed}/{len(unread_elements)}", flush=True)
+            log.debug("👉 Opening unread chat %s/%s", processed, total_unread)
             try:
-                await elem.scroll_into_view_if_needed()
-                await elem.click()
-                print("🟢 Clicked unread chat successfully", flush=True)
-                await asyncio.sleep(2.5)
-
-                await page.click(
-                    "#mainTeamInbox div.chat-side-content div span.chat-input__icon-option",
-                    timeout=10000,
+                if not await page.evaluate(OPEN_CHAT_JS, idx):
+                    log.warning(f"⚠️ Unread chat #{processed} left the list, skipping.")
+                    continue
+                log.debug("🟢 Clicked unread chat successfully")
+                # The options icon stays visible from the previous chat, so wait for
+                # this row's unread badge to clear before acting on the open chat
+                opened_badge = page.locator(
+                    f'[data-bot-idx="{idx}"] div.conversation-item__unread-count, '
+                    f'div.conversation-item__unread-count[data-bot-idx="{idx}"]'
                 )
-                await asyncio.sleep(1.5)
+                await wait_for_adaptive(opened_badge, state="detached")
+                await options_loc.click(timeout=adaptive_timeout_ms())
 
-                ads_ctwa = await page.query_selector("#flow-nav-68ff67df4f393f0757f108d8")
-                if ads_ctwa:
-                    await ads_ctwa.click()
-                    print("✅ Clicked Ads (CTWA) successfully!", flush=True)
-                else:
-                    print("⚠️ 'Ads (CTWA)' not found.", flush=True)
+                try:
+                    await ads_loc.click(timeout=5000)
+                    log.info("✅ Clicked Ads (CTWA) successfully!")
+                except PlaywrightTimeout:
+                    log.warning("⚠️ 'Ads (CTWA)' not found.")
 
-                await asyncio.sleep(2)
+                try:
+                    await page.wait_for_load_state("networkidle", timeout=5000)
+                except PlaywrightTimeout:
+                    pass
 
             except Exception as e:
-                print(f"⚠️ Error in chat #{processed}: {e}", flush=True)
+                log.warning(f"⚠️ Error in chat #{processed}: {e}")
                 continue
 
-        print("🕒 Waiting before next check...", flush=True)
-        await asyncio.sleep(CHECK_INTERVAL)
-        await page.reload()
+        if processed:
+            current_interval = max(MIN_CHECK_INTERVAL, current_interval // 2)
+        log.info(f"🕒 Waiting {current_interval}s before next check...")
+        await wait_for_unread(page, unread_event, current_interval)
+
+# 🚫 Tracker hosts the bot never needs. They are refused at Chromium's resolver:
+# a Playwright route would disable the HTTP cache and add a Python round-trip
+# to every request. Fonts and media are left alone to keep that cache working.
+BLOCKED_HOSTS = ("google-analytics.com", "googletagmanager.com", "hotjar.com", "clarity.ms", "facebook.net")
+BLOCKED_HOSTS_RULES = ", ".join(
+    f"MAP {host} ~NOTFOUND, MAP *.{host} ~NOTFOUND" for host in BLOCKED_HOSTS
+)
+
+# ⚙️ Chromium flags
+CHROMIUM_ARGS = [
+    # 100 MB HTTP cache kept in the profile across restarts. Playwright turns the
+    # cache off for any context with a route, so keep request blocking out of routes.
+    "--disk-cache-size=104857600",
+    # Skip helpers a headless container bot never uses (GPU, extensions, /dev/shm)
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-renderer-backgrounding",
+    "--blink-settings=imagesEnabled=false",  # never decode images, even cached ones
+    f"--host-resolver-rules={BLOCKED_HOSTS_RULES}",
+]
+
+# ✅ Launch the persistent browser context (reused for the bot lifetime)
+# lean=False gives a normal browser (images, fonts) for a human to log in with
+async def launch_browser_context(p, headless_mode=True, lean=True):
+    browser_context = await p.chromium.launch_persistent_context(
+        user_data_dir=USER_DATA_DIR,
+        headless=headless_mode,
+        args=CHROMIUM_ARGS if lean else [],
+        viewport={"width": 1280, "height": 720},
+    )
+    return browser_context
 
 # ✅ Main bot flow
 async def run_wati_bot():
-    print("🌐 Launching WATI automation with persistent browser...", flush=True)
+    log.info("🌐 Launching WATI automation with persistent browser...")
     headless_mode = True
 
     async with async_playwright() as p:
-        browser_context = await p.chromium.launch_persistent_context(
-            user_data_dir=USER_DATA_DIR,
-            headless=headless_mode,
-        )
-        page = await browser_context.new_page()
-        print("🌍 Navigating to WATI Inbox...", flush=True)
-        await page.goto(WATI_URL, timeout=60000)
-        await asyncio.sleep(3)
+        browser_context = await launch_browser_context(p, headless_mode)
 
         try:
-            await page.wait_for_selector("text=Team Inbox", timeout=60000)
-            print("✅ Logged in — session active!", flush=True)
-        except PlaywrightTimeout:
-            success = await auto_login(page)
-            if not success:
-                print("ℹ️ Falling back to manual login...")
-                success = await wait_for_manual_login(page, browser_context)
+            while True:
+                page = None
+                try:
+                    try:
+                        page = await browser_context.new_page()
+                    except PlaywrightError:
+                        # Only a dead browser justifies a relaunch; everything else reuses it
+                        log.warning("♻️ Browser context closed — relaunching Chromium...")
+                        # Close the old context first, or its profile lock blocks the relaunch
+                        try:
+                            await browser_context.close()
+                        except PlaywrightError:
+                            pass
+                        browser_context = await launch_browser_context(p, headless_mode)
+                        page = await browser_context.new_page()
+
+                    log.info("🌍 Navigating to WATI Inbox...")
+                    await page.goto(WATI_URL, timeout=60000)
+
+                    try:
+                        await page.wait_for_selector(INBOX_READY_SELECTOR, timeout=60000)
+                        log.info("✅ Logged in — session active!")
+                    except PlaywrightTimeout:
+                        success = await auto_login(page)
+                        # Manual login needs a visible window; headless runs use BOT_MODE=save
+                        if not success and not headless_mode:
+                            log.info("ℹ️ Falling back to manual login...")
+                            success = await wait_for_manual_login(page, browser_context)
+                        if not success:
+                            raise RuntimeError("WATI login failed")
+
+                    log.info("🤖 Starting main WATI automation loop...")
+                    await main_automation(page)
+                except Exception as e:
+                    log.error(f"🚨 Bot error: {e} — reopening the inbox page...")
+                    if page is not None:
+                        try:
+                            await page.close()
+                        except PlaywrightError:
+                            pass
+                    await asyncio.sleep(10)
+        finally:
+            # Close cleanly so Chromium flushes the persistent profile to disk
+            try:
+                await browser_context.close()
+            except PlaywrightError:
+                pass
 
-        print("🤖 Starting main WATI automation loop...", flush=True)
-        await main_automation(page)
+# 💾 One-off login capture (BOT_MODE=save): log in by hand, save, exit
+async def save_login_session():
+    log.info("💾 Save mode: opening a browser window for manual login...")
+    async with async_playwright() as p:
+        browser_context = await launch_browser_context(p, headless_mode=False, lean=False)
+        try:
+            page = await browser_context.new_page()
+            await wait_for_manual_login(page, browser_context)
+        finally:
+            await browser_context.close()
 
 # ✅ Web server for health checks
-async def start_web_server():
+async def start_web_server(bot_ready):
     async def handle(request):
+        # 200 either way so Render keeps the service alive during a cold start
+        if not bot_ready.is_set():
+            return web.Response(text="⏳ WATI AutoBot initializing...")
         return web.Response(text="✅ WATI AutoBot running successfully!")
 
     app = web.Application()
@@ -218,15 +499,56 @@ async def start_web_server():
     await runner.setup()
     site = web.TCPSite(runner, "0.0.0.0", int(os.getenv("PORT", 10000)))
     await site.start()
-    print("🌍 Web server running!", flush=True)
+    log.info("🌍 Web server running!")
+
+    # Stay alive so the TaskGroup can cancel us and release the socket
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+# 🧰 Profile + browser setup (slow on cold starts)
+async def prepare_environment():
+    # Heavy import runs in a thread so the already-bound server keeps answering
+    await asyncio.to_thread(load_playwright)
+    # Extraction (blocking file IO, in a thread) and the Chromium check are
+    # independent, so they run side by side; the TaskGroup cancels the other job if one fails
+    async with asyncio.TaskGroup() as tg:
+        tg.create_task(asyncio.to_thread(unzip_wati_profile))
+        tg.create_task(ensure_chromium_installed())
+
+async def prepare_and_run_bot(bot_ready):
+    await prepare_environment()
+    bot_ready.set()
+    await run_wati_bot()
 
 # 🚀 Entry point
 async def main():
-    print("🚀 Initializing environment...", flush=True)
-    unzip_wati_profile()
-    await ensure_chromium_installed()
-    print("🚀 Starting bot and web server...", flush=True)
-    await asyncio.gather(start_web_server(), run_wati_bot())
+    # One background flusher drains the batched log handler in every mode
+    log_flusher = asyncio.create_task(flush_logs_periodically())
+    try:
+        await run_mode()
+    finally:
+        log_flusher.cancel()
+        log_handler.flush()
+
+async def run_mode():
+    log.info("🚀 Initializing environment...")
+    log.info(f"⚙️ Event loop: {type(asyncio.get_running_loop()).__module__}")
+    if BOT_MODE == "save":
+        await prepare_environment()
+        await save_login_session()
+        return
+    log.info("🚀 Starting bot and web server...")
+    # Server starts first so health checks pass while the profile/Chromium set up.
+    # If either task fails, the TaskGroup cancels the other (no orphaned Chromium)
+    bot_ready = asyncio.Event()
+    async with asyncio.TaskGroup() as tg:
+        tg.create_task(start_web_server(bot_ready))
+        tg.create_task(prepare_and_run_bot(bot_ready))
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())